@@ -1,12 +1,20 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import functools
 import itertools
-import json
+import os
 import re
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, NamedTuple, TYPE_CHECKING
+from typing import AbstractSet, Any, Dict, Iterator, List, NamedTuple, Tuple, TYPE_CHECKING
+
+try:
+    from orjson import loads  # type: ignore
+except ImportError:
+    from json import loads  # type: ignore
 
 
 class DellAmicoKey(NamedTuple):
@@ -27,27 +35,213 @@ class Namespace(argparse.Namespace):
     if TYPE_CHECKING:
         against: Path
         directory: Path
+        incremental: bool
+
+
+RESULT_PATTERN = re.compile(r"^.+?-\w{8}(?<!solution)\.json$")
+
+
+def route_statistics(vehicles: List[List[List[int]]], demands: List[float]) -> Tuple[int, int, float]:
+    # Route count, customer count and total weight of all routes
+    routes_count = customers = 0
+    for routes in vehicles:
+        for route in routes:
+            routes_count += 1
+            customers += len(route) - 2
+
+    # Sum per route, then per vehicle, then across vehicles: keeps the exact floating-point results of the original columns
+    weight = sum(sum(sum(map(demands.__getitem__, route)) for route in routes) for routes in vehicles)
+    return routes_count, customers, weight
+
+
+def is_result(filename: str) -> bool:
+    # Same as RESULT_PATTERN.fullmatch(filename), without invoking the regex engine for "<problem>-<8 alphanumerics>.json"
+    if len(filename) < 15 or filename[-14] != "-" or not filename.endswith(".json"):
+        return False
+
+    suffix = filename[-13:-5]
+    if suffix.isalnum():
+        return suffix != "solution" and "\n" not in filename
+
+    return RESULT_PATTERN.fullmatch(filename) is not None
+
+
+def iter_json(root: str, skip: AbstractSet[str]) -> Iterator[str]:
+    # Files of a directory are yielded in name order, before those of its subdirectories.
+    # Paths in `skip` are not yielded.
+    with os.scandir(root) as iterator:
+        entries = sorted(iterator, key=lambda entry: entry.name)
+
+    for entry in entries:
+        if entry.is_file() and is_result(entry.name) and entry.path not in skip:
+            yield entry.path
 
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_json(entry.path, skip)
 
-def wrap(content: Any) -> str:
-    return f"\"{content}\""
+
+def build_row(dell_amico: Dict[DellAmicoKey, DellAmicoResult], path: str, row: int) -> Tuple[List[Any], Tuple[Any, ...]]:
+    # CSV row (the row-th line of the spreadsheet) and database record of a result file
+    with open(path, "rb") as reader:
+        data = loads(reader.read())
+
+    problem, el, sp, dc, dp, *_ = data["problem"].split("_")
+
+    solution = data["solution"]
+    truck_routes = solution["truck_routes"]
+    drone_routes = solution["drone_routes"]
+
+    config = data["config"]
+    demands = config["demands"]
+    drone_data = config["drone"]["_data"]
+    truck_route_count, truck_customers, truck_weight = route_statistics(truck_routes, demands)
+    drone_route_count, drone_customers, drone_weight = route_statistics(drone_routes, demands)
+    truck_paths = str(truck_routes)
+    drone_paths = str(drone_routes)
+
+    compare = dell_amico[DellAmicoKey(problem, el, sp, dc, dp)]
+    segments = [
+        f"{problem}_{el}_{sp}_{dc}_{dp}",
+        truck_customers + drone_customers,
+        config["trucks_count"],
+        config["drones_count"],
+        data["iterations"],
+        config["tabu_size_factor"],
+        config["reset_after_factor"],
+        data["tabu_size"],
+        data["reset_after"],
+        config["max_elite_size"],
+        config["penalty_exponent"],
+        config["ejection_chain_iterations"],
+        config["destroy_rate"],
+        config["config"],
+        config["speed_type"],
+        config["range_type"],
+        config["waiting_time_limit"],
+        config["truck"]["V_max (m/s)"],
+        drone_data.get("FixedTime (s)", -1),
+        drone_data.get("V_max (m/s)", -1),
+        solution["working_time"],
+        compare.fast,
+        compare.rrls,
+        f"=ROUND(100 * (V{row} - U{row}) / ABS(V{row}), 2)",
+        f"=ROUND(100 * (W{row} - U{row}) / ABS(W{row}), 2)",
+        "",
+        "",
+        solution["capacity_violation"],
+        solution["energy_violation"],
+        solution["waiting_time_violation"],
+        solution["fixed_time_violation"],
+        truck_paths,
+        drone_paths,
+        solution["truck_working_time"],
+        solution["drone_working_time"],
+        int(solution["feasible"]),
+        data["last_improved"],
+        data["elapsed"],
+        config["extra"],
+        f"=ROUND(100 * (Z{row} - AL{row}) / ABS(Z{row}), 2)",
+        f"=ROUND(100 * (AA{row} - AL{row}) / ABS(AA{row}), 2)",
+        truck_weight / truck_route_count if truck_route_count > 0 else 0,
+        truck_customers / truck_route_count if truck_route_count > 0 else 0,
+        truck_route_count,
+        drone_weight / drone_route_count if drone_route_count > 0 else 0,
+        drone_customers / drone_route_count if drone_route_count > 0 else 0,
+        drone_route_count,
+        config["strategy"],
+    ]
+
+    record = (
+        problem,
+        truck_customers + drone_customers,
+        config["trucks_count"],
+        config["drones_count"],
+        data["iterations"],
+        config["tabu_size_factor"],
+        config["reset_after_factor"],
+        data["tabu_size"],
+        data["reset_after"],
+        config["max_elite_size"],
+        config["penalty_exponent"],
+        config["ejection_chain_iterations"],
+        config["destroy_rate"],
+        config["config"],
+        config["speed_type"],
+        config["range_type"],
+        config["waiting_time_limit"],
+        config["truck"]["V_max (m/s)"],
+        drone_data.get("FixedTime (s)", -1),
+        drone_data.get("V_max (m/s)", -1),
+        solution["working_time"] / 60,
+        solution["capacity_violation"],
+        solution["energy_violation"],
+        solution["waiting_time_violation"],
+        solution["fixed_time_violation"],
+        truck_paths,
+        drone_paths,
+        str(solution["truck_working_time"]),
+        str(solution["drone_working_time"]),
+        int(solution["feasible"]),
+        data["last_improved"],
+        data["elapsed"],
+        config["extra"],
+        truck_weight / truck_route_count if truck_route_count > 0 else 0,
+        truck_customers / truck_route_count if truck_route_count > 0 else 0,
+        truck_route_count,
+        drone_weight / drone_route_count if drone_route_count > 0 else 0,
+        drone_customers / drone_route_count if drone_route_count > 0 else 0,
+        drone_route_count,
+        config["strategy"],
+        el,
+        sp,
+        dc,
+        dp,
+    )
+
+    return segments, record
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument("--against", type=Path, default="problems/dell-amico/tsplib-results.csv")
     parser.add_argument("--directory", type=Path, default="outputs/")
+    parser.add_argument("--incremental", action="store_true", help="Append results not summarized by the previous run instead of rebuilding the summary")
     namespace = parser.parse_args(namespace=Namespace())
 
     against = namespace.against
     directory = namespace.directory
     output_csv = directory / "summary.csv"
     output_db = directory / "summary.db"
+    output_state = directory / "summary.state"
 
-    pattern = re.compile(r"^.+?-\w{8}(?<!solution)\.json$")
+    # Result files already in summary.csv and summary.db, relative to the directory, one per line
+    processed: List[str] = []
+    incremental = False
+    if namespace.incremental and output_csv.is_file() and output_db.is_file() and output_state.is_file():
+        with output_state.open("r", encoding="utf-8", newline="") as reader:
+            processed = [line[:-1] for line in reader]
 
-    with output_csv.open("w", encoding="utf-8") as csv:
-        csv.write("sep=,\n")
+        # Only trust the state if both outputs hold exactly the results it lists (below the "sep=," and header lines)
+        with output_csv.open("r", encoding="utf-8", newline="") as file:
+            csv_count = sum(1 for _ in csv.reader(file)) - 2
+
+        try:
+            with sqlite3.connect(output_db) as connection:
+                db_count = connection.execute("SELECT COUNT(*) FROM summary").fetchone()[0]
+        except sqlite3.Error:
+            db_count = -1
+
+        incremental = csv_count == db_count == len(processed)
+
+    if not incremental:
+        # Removed before the outputs are truncated, so that an interrupted rebuild is never continued
+        processed.clear()
+        output_state.unlink(missing_ok=True)
+
+    row = 2 + len(processed)
+    with output_csv.open("a" if incremental else "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, lineterminator="\n")
         headers = [
             "Problem",
             "Customers count",
@@ -98,11 +292,12 @@ if __name__ == "__main__":
             "Drone routes count",
             "Strategy",
         ]
-        csv.write(",".join(headers))
-        csv.write("\n")
+        if not incremental:
+            file.write("sep=,\n")
+            writer.writerow(headers)
 
-        if output_db.is_file():
-            output_db.unlink()
+            if output_db.is_file():
+                output_db.unlink()
 
         with sqlite3.connect(output_db) as connection:
             cursor = connection.cursor()
@@ -154,8 +349,9 @@ if __name__ == "__main__":
                 "dp INTEGER NOT NULL",
             ]
 
-            query = "CREATE TABLE summary(" + ", ".join(columns) + ")"
-            cursor.execute(query)
+            if not incremental:
+                query = "CREATE TABLE summary(" + ", ".join(columns) + ")"
+                cursor.execute(query)
 
             query = "INSERT INTO summary VALUES (" + ", ".join(itertools.repeat("?", len(columns))) + ")"
 
@@ -166,130 +362,13 @@ if __name__ == "__main__":
                     key = DellAmicoKey(problem, el, sp, dc, dp)
                     dell_amico[key] = DellAmicoResult(float(best), float(fast), float(rrls))
 
-            row = 2
-            for (dirpath, _, filenames) in directory.walk():
-                filenames.sort()
-                for filename in filenames:
-                    if not pattern.fullmatch(filename):
-                        continue
-
-                    with open(dirpath / filename, "r", encoding="utf-8") as reader:
-                        data = json.load(reader)
-
-                    problem, el, sp, dc, dp, *_ = data["problem"].split("_")
-
-                    truck_routes = data["solution"]["truck_routes"]
-                    drone_routes = data["solution"]["drone_routes"]
-
-                    truck_route_count = sum(len(routes) for routes in truck_routes)
-                    drone_route_count = sum(len(routes) for routes in drone_routes)
-
-                    config = data["config"]
-                    truck_weight = sum(sum(sum(config["demands"][c] for c in route) for route in routes) for routes in truck_routes)
-                    drone_weight = sum(sum(sum(config["demands"][c] for c in route) for route in routes) for routes in drone_routes)
-                    truck_customers = sum(sum(len(route) - 2 for route in routes) for routes in truck_routes)
-                    drone_customers = sum(sum(len(route) - 2 for route in routes) for routes in drone_routes)
-
-                    compare = dell_amico[DellAmicoKey(problem, el, sp, dc, dp)]
-                    segments = [
-                        wrap(f"{problem}_{el}_{sp}_{dc}_{dp}"),
-                        str(truck_customers + drone_customers),
-                        str(config["trucks_count"]),
-                        str(config["drones_count"]),
-                        str(data["iterations"]),
-                        str(config["tabu_size_factor"]),
-                        str(config["reset_after_factor"]),
-                        str(data["tabu_size"]),
-                        str(data["reset_after"]),
-                        str(config["max_elite_size"]),
-                        str(config["penalty_exponent"]),
-                        str(config["ejection_chain_iterations"]),
-                        str(config["destroy_rate"]),
-                        config["config"],
-                        config["speed_type"],
-                        config["range_type"],
-                        str(config["waiting_time_limit"]),
-                        str(config["truck"]["V_max (m/s)"]),
-                        str(config["drone"]["_data"].get("FixedTime (s)", -1)),
-                        str(config["drone"]["_data"].get("V_max (m/s)", -1)),
-                        str(data["solution"]["working_time"]),
-                        str(compare.fast),
-                        str(compare.rrls),
-                        wrap(f"=ROUND(100 * (V{row} - U{row}) / ABS(V{row}), 2)"),
-                        wrap(f"=ROUND(100 * (W{row} - U{row}) / ABS(W{row}), 2)"),
-                        "",
-                        "",
-                        str(data["solution"]["capacity_violation"]),
-                        str(data["solution"]["energy_violation"]),
-                        str(data["solution"]["waiting_time_violation"]),
-                        str(data["solution"]["fixed_time_violation"]),
-                        wrap(data["solution"]["truck_routes"]),
-                        wrap(data["solution"]["drone_routes"]),
-                        wrap(data["solution"]["truck_working_time"]),
-                        wrap(data["solution"]["drone_working_time"]),
-                        str(int(data["solution"]["feasible"])),
-                        str(data["last_improved"]),
-                        str(data["elapsed"]),
-                        wrap(config["extra"]),
-                        wrap(f"=ROUND(100 * (Z{row} - AL{row}) / ABS(Z{row}), 2)"),
-                        wrap(f"=ROUND(100 * (AA{row} - AL{row}) / ABS(AA{row}), 2)"),
-                        str(truck_weight / truck_route_count if truck_route_count > 0 else 0),
-                        str(truck_customers / truck_route_count if truck_route_count > 0 else 0),
-                        str(truck_route_count),
-                        str(drone_weight / drone_route_count if drone_route_count > 0 else 0),
-                        str(drone_customers / drone_route_count if drone_route_count > 0 else 0),
-                        str(drone_route_count),
-                        config["strategy"],
-                    ]
-                    csv.write(",".join(segments) + "\n")
-                    row += 1
-
-                    cursor.execute(
-                        query,
-                        (
-                            problem,
-                            truck_customers + drone_customers,
-                            config["trucks_count"],
-                            config["drones_count"],
-                            data["iterations"],
-                            config["tabu_size_factor"],
-                            config["reset_after_factor"],
-                            data["tabu_size"],
-                            data["reset_after"],
-                            config["max_elite_size"],
-                            config["penalty_exponent"],
-                            config["ejection_chain_iterations"],
-                            config["destroy_rate"],
-                            config["config"],
-                            config["speed_type"],
-                            config["range_type"],
-                            config["waiting_time_limit"],
-                            config["truck"]["V_max (m/s)"],
-                            config["drone"]["_data"].get("FixedTime (s)", -1),
-                            config["drone"]["_data"].get("V_max (m/s)", -1),
-                            data["solution"]["working_time"] / 60,
-                            data["solution"]["capacity_violation"],
-                            data["solution"]["energy_violation"],
-                            data["solution"]["waiting_time_violation"],
-                            data["solution"]["fixed_time_violation"],
-                            str(data["solution"]["truck_routes"]),
-                            str(data["solution"]["drone_routes"]),
-                            str(data["solution"]["truck_working_time"]),
-                            str(data["solution"]["drone_working_time"]),
-                            int(data["solution"]["feasible"]),
-                            data["last_improved"],
-                            data["elapsed"],
-                            config["extra"],
-                            truck_weight / truck_route_count if truck_route_count > 0 else 0,
-                            truck_customers / truck_route_count if truck_route_count > 0 else 0,
-                            truck_route_count,
-                            drone_weight / drone_route_count if drone_route_count > 0 else 0,
-                            drone_customers / drone_route_count if drone_route_count > 0 else 0,
-                            drone_route_count,
-                            config["strategy"],
-                            el,
-                            sp,
-                            dc,
-                            dp,
-                        )
-                    )
+            paths = list(iter_json(str(directory), {os.path.join(directory, path) for path in processed}))
+            with ProcessPoolExecutor() as executor:
+                results = list(executor.map(functools.partial(build_row, dell_amico), paths, itertools.count(row), chunksize=32))
+
+            writer.writerows(segments for segments, _ in results)
+            cursor.executemany(query, [record for _, record in results])
+
+    processed.extend(os.path.relpath(path, directory) for path in paths)
+    with output_state.open("w", encoding="utf-8", newline="") as file:
+        file.writelines(f"{path}\n" for path in processed)
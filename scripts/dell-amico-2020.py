@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import json
 import tempfile
 from pathlib import Path
 from typing import List, Literal, TYPE_CHECKING
@@ -16,6 +15,43 @@ class Namespace(argparse.Namespace):
         dp: Literal[1, 2]
 
 
+TRUCK_CONFIG = """{
+    "V_max (m/s)": 1,
+    "M_t (kg)": 1
+}"""
+
+DRONE_CONFIG_TEMPLATE = """[
+    {{
+        "speed_type": "low",
+        "range_type": "low",
+        "capacity [kg]": 1,
+        "FixedTime (s)": 31557600,
+        "V_max (m/s)": {speed}
+    }},
+    {{
+        "speed_type": "low",
+        "range_type": "high",
+        "capacity [kg]": 1,
+        "FixedTime (s)": 31557600,
+        "V_max (m/s)": {speed}
+    }},
+    {{
+        "speed_type": "high",
+        "range_type": "low",
+        "capacity [kg]": 1,
+        "FixedTime (s)": 31557600,
+        "V_max (m/s)": {speed}
+    }},
+    {{
+        "speed_type": "high",
+        "range_type": "high",
+        "capacity [kg]": 1,
+        "FixedTime (s)": 31557600,
+        "V_max (m/s)": {speed}
+    }}
+]"""
+
+
 ROOT = Path(__file__).parent.parent.resolve()
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -29,7 +65,6 @@ if __name__ == "__main__":
     x: List[float] = []
     y: List[float] = []
     dronable: List[bool] = []
-    demands: List[float] = []
 
     with ROOT.joinpath(
         "problems",
@@ -38,19 +73,18 @@ if __name__ == "__main__":
         "Instances",
         f"{args.instance}_{args.dp - 1}_{args.el}.csv",
     ).open("r", encoding="utf-8") as reader:
-        for line in reader.readlines():
+        for line in reader:
             _, _x_str, _y_str, _truck_only_str = map(str.strip, line.split(","))
             x.append(float(_x_str))
             y.append(float(_y_str))
             dronable.append(_truck_only_str == "0")
-            demands.append(0.0)
 
     # The depot is the first and last customer in the list
     depot = x[0], y[0]
     x = x[1:-1]
     y = y[1:-1]
     dronable = dronable[1:-1]
-    demands = demands[1:-1]
+    demands = [0.0] * len(x)
 
     with tempfile.NamedTemporaryFile(
         "w",
@@ -65,8 +99,12 @@ if __name__ == "__main__":
         output.write(f"depot {depot[0]} {depot[1]}\n")
 
         output.write("Coordinate X         Coordinate Y         Dronable Demand\n")
-        for _x, _y, _dronable, _demand in zip(x, y, dronable, demands, strict=True):
-            output.write(f"{_x:20} {_y:20} {int(_dronable)} {_demand:20}\n")
+        output.write(
+            "".join(
+                f"{_x:20} {_y:20} {int(_dronable)} {_demand:20}\n"
+                for _x, _y, _dronable, _demand in zip(x, y, dronable, demands)
+            ),
+        )
 
     with tempfile.NamedTemporaryFile(
         "w",
@@ -74,15 +112,7 @@ if __name__ == "__main__":
         suffix=".json",
         delete=False,
     ) as truck:
-        json.dump(
-            {
-                "V_max (m/s)": 1,
-                "M_t (kg)": 1,
-            },
-            truck,
-            indent=4,
-            ensure_ascii=False,
-        )
+        truck.write(TRUCK_CONFIG)
 
     with tempfile.NamedTemporaryFile(
         "w",
@@ -90,38 +120,7 @@ if __name__ == "__main__":
         suffix=".json",
         delete=False,
     ) as drone:
-        common = {
-            "capacity [kg]": 1,
-            "FixedTime (s)": 31557600,
-            "V_max (m/s)": args.sp,
-        }
-        json.dump(
-            [
-                {
-                    "speed_type": "low",
-                    "range_type": "low",
-                    **common,
-                },
-                {
-                    "speed_type": "low",
-                    "range_type": "high",
-                    **common,
-                },
-                {
-                    "speed_type": "high",
-                    "range_type": "low",
-                    **common,
-                },
-                {
-                    "speed_type": "high",
-                    "range_type": "high",
-                    **common,
-                },
-            ],
-            drone,
-            indent=4,
-            ensure_ascii=False,
-        )
+        drone.write(DRONE_CONFIG_TEMPLATE.format(speed=args.sp))
 
     print(
         f"run {output.name} --truck-cfg {truck.name} --drone-cfg {drone.name} -c endurance "
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import json
 import tempfile
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -13,6 +12,43 @@ class Namespace(argparse.Namespace):
         single_truck_route: bool
 
 
+TRUCK_CONFIG = """{
+    "V_max (m/s)": 15.557,
+    "M_t (kg)": 9000
+}"""
+
+DRONE_CONFIG = """[
+    {
+        "speed_type": "low",
+        "range_type": "low",
+        "capacity [kg]": 9000,
+        "FixedTime (s)": 7200,
+        "V_max (m/s)": 22.2626
+    },
+    {
+        "speed_type": "low",
+        "range_type": "high",
+        "capacity [kg]": 9000,
+        "FixedTime (s)": 7200,
+        "V_max (m/s)": 22.2626
+    },
+    {
+        "speed_type": "high",
+        "range_type": "low",
+        "capacity [kg]": 9000,
+        "FixedTime (s)": 7200,
+        "V_max (m/s)": 22.2626
+    },
+    {
+        "speed_type": "high",
+        "range_type": "high",
+        "capacity [kg]": 9000,
+        "FixedTime (s)": 7200,
+        "V_max (m/s)": 22.2626
+    }
+]"""
+
+
 ROOT = Path(__file__).parent.parent.resolve()
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -25,15 +61,7 @@ if __name__ == "__main__":
         suffix=".json",
         delete=False,
     ) as truck:
-        json.dump(
-            {
-                "V_max (m/s)": 15.557,
-                "M_t (kg)": 9000,
-            },
-            truck,
-            indent=4,
-            ensure_ascii=False,
-        )
+        truck.write(TRUCK_CONFIG)
 
     with tempfile.NamedTemporaryFile(
         "w",
@@ -41,38 +69,7 @@ if __name__ == "__main__":
         suffix=".json",
         delete=False,
     ) as drone:
-        common = {
-            "capacity [kg]": 9000,
-            "FixedTime (s)": 7200,
-            "V_max (m/s)": 22.2626,
-        }
-        json.dump(
-            [
-                {
-                    "speed_type": "low",
-                    "range_type": "low",
-                    **common,
-                },
-                {
-                    "speed_type": "low",
-                    "range_type": "high",
-                    **common,
-                },
-                {
-                    "speed_type": "high",
-                    "range_type": "low",
-                    **common,
-                },
-                {
-                    "speed_type": "high",
-                    "range_type": "high",
-                    **common,
-                },
-            ],
-            drone,
-            indent=4,
-            ensure_ascii=False,
-        )
+        drone.write(DRONE_CONFIG)
 
     print(
         f"run {args.problem} --truck-cfg {truck.name} --drone-cfg {drone.name} -c endurance "
@@ -1,11 +1,10 @@
 from __future__ import annotations
 
 import argparse
-import json
 import re
 import tempfile
 from pathlib import Path
-from typing import List, TYPE_CHECKING
+from typing import Dict, List, Tuple, TYPE_CHECKING
 
 
 class Namespace(argparse.Namespace):
@@ -13,6 +12,52 @@ class Namespace(argparse.Namespace):
         path: Path
 
 
+TRUCK_CONFIG = """{
+    "V_max (m/s)": 1,
+    "M_t (kg)": 1
+}"""
+
+DRONE_CONFIG = """[
+    {
+        "speed_type": "low",
+        "range_type": "low",
+        "capacity [kg]": 1,
+        "FixedTime (s)": 31557600,
+        "V_max (m/s)": 1
+    },
+    {
+        "speed_type": "low",
+        "range_type": "high",
+        "capacity [kg]": 1,
+        "FixedTime (s)": 31557600,
+        "V_max (m/s)": 1
+    },
+    {
+        "speed_type": "high",
+        "range_type": "low",
+        "capacity [kg]": 1,
+        "FixedTime (s)": 31557600,
+        "V_max (m/s)": 1
+    },
+    {
+        "speed_type": "high",
+        "range_type": "high",
+        "capacity [kg]": 1,
+        "FixedTime (s)": 31557600,
+        "V_max (m/s)": 1
+    }
+]"""
+
+
+# Mapping from instances to (trucks count, drones count)
+FLEET_SIZE: Dict[str, Tuple[int, int]] = {
+    "CMT1": (3, 2),
+    "CMT2": (5, 5),
+    "CMT3": (4, 4),
+    "CMT4": (6, 6),
+    "CMT5": (9, 8),
+}
+FLEET_SIZE_PATTERN = re.compile(r"^[A-Z]-n\d+-k(\d+)$")
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("path", type=Path, help="Path to the original CVRP instance")
@@ -20,35 +65,32 @@ if __name__ == "__main__":
 
     x: List[float] = []
     y: List[float] = []
-    dronable: List[bool] = []
-    demands: List[float] = []
 
     with args.path.open("r", encoding="utf-8") as reader:
-        data = reader.read()
-        for match in re.finditer(r"^\s*\d+\s+(-?[\d\.]+)\s+(-?[\d\.]+)\s*$", data, flags=re.MULTILINE):
-            _x, _y = map(float, match.groups())
-            x.append(_x)
-            y.append(_y)
-            dronable.append(True)
-            demands.append(0)
+        # Skip the specification part, then read "<index> <x> <y>" lines until the next section
+        for line in reader:
+            if line.strip() == "NODE_COORD_SECTION":
+                break
+
+        for line in reader:
+            parts = line.split()
+            if len(parts) != 3 or not parts[0].isdigit():
+                break
+
+            x.append(float(parts[1]))
+            y.append(float(parts[2]))
 
     # The depot is the first customer in the list
     depot = x.pop(0), y.pop(0)
-    dronable = dronable[1:]
-    demands = demands[1:]
-
-    # Mapping from instances to fleet sizes
-    FLEET_SIZE = {
-        "CMT1": 5,
-        "CMT2": 10,
-        "CMT3": 8,
-        "CMT4": 12,
-        "CMT5": 17,
-    }
+    dronable = [True] * len(x)
+    demands: List[float] = [0] * len(x)
+
     try:
-        fleet_size = FLEET_SIZE[args.path.stem]
+        trucks_count, drones_count = FLEET_SIZE[args.path.stem]
     except KeyError:
-        fleet_size = int(re.fullmatch(r"^[A-Z]-n\d+-k(\d+)$", args.path.stem).group(1))  # type: ignore
+        # Otherwise the fleet size is the "k" part of the instance name, split evenly between trucks and drones
+        fleet_size = int(FLEET_SIZE_PATTERN.fullmatch(args.path.stem).group(1))  # type: ignore
+        trucks_count, drones_count = (fleet_size + 1) // 2, fleet_size // 2
 
     with tempfile.NamedTemporaryFile(
         "w",
@@ -57,14 +99,18 @@ if __name__ == "__main__":
         prefix=f"{args.path.stem}_",
         delete=False,
     ) as output:
-        output.write(f"trucks_count {(fleet_size + 1) // 2}\n")
-        output.write(f"drones_count {fleet_size // 2}\n")
+        output.write(f"trucks_count {trucks_count}\n")
+        output.write(f"drones_count {drones_count}\n")
         output.write(f"customers {len(x)}\n")
         output.write(f"depot {depot[0]} {depot[1]}\n")
 
         output.write("Coordinate X         Coordinate Y         Dronable Demand\n")
-        for _x, _y, _dronable, _demand in zip(x, y, dronable, demands, strict=True):
-            output.write(f"{_x:20} {_y:20} {int(_dronable)} {_demand:20}\n")
+        output.write(
+            "".join(
+                f"{_x:20} {_y:20} {int(_dronable)} {_demand:20}\n"
+                for _x, _y, _dronable, _demand in zip(x, y, dronable, demands)
+            ),
+        )
 
     with tempfile.NamedTemporaryFile(
         "w",
@@ -72,15 +118,7 @@ if __name__ == "__main__":
         suffix=".json",
         delete=False,
     ) as truck:
-        json.dump(
-            {
-                "V_max (m/s)": 1,
-                "M_t (kg)": 1,
-            },
-            truck,
-            indent=4,
-            ensure_ascii=False,
-        )
+        truck.write(TRUCK_CONFIG)
 
     with tempfile.NamedTemporaryFile(
         "w",
@@ -88,38 +126,7 @@ if __name__ == "__main__":
         suffix=".json",
         delete=False,
     ) as drone:
-        common = {
-            "capacity [kg]": 1,
-            "FixedTime (s)": 31557600,
-            "V_max (m/s)": 1,
-        }
-        json.dump(
-            [
-                {
-                    "speed_type": "low",
-                    "range_type": "low",
-                    **common,
-                },
-                {
-                    "speed_type": "low",
-                    "range_type": "high",
-                    **common,
-                },
-                {
-                    "speed_type": "high",
-                    "range_type": "low",
-                    **common,
-                },
-                {
-                    "speed_type": "high",
-                    "range_type": "high",
-                    **common,
-                },
-            ],
-            drone,
-            indent=4,
-            ensure_ascii=False,
-        )
+        drone.write(DRONE_CONFIG)
 
     print(
         f"run {output.name} --truck-cfg {truck.name} --drone-cfg {drone.name} -c endurance "